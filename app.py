@@ -1,16 +1,60 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-import base64
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, Field, ValidationError
+import msgspec
+import pybase64
+import binascii
+import codecs
 import tempfile
 import os
-from typing import Union, Dict, Any
+import logging
+import mmap
+import struct
+from typing import Union, Dict, Any, Optional, Final, Annotated
 import mimetypes  # Use mimetypes instead of magic for Windows compatibility
 from datetime import datetime
-import uuid
+import itertools
+
+# Request path logging; production (Azure Web App sets WEBSITE_SITE_NAME) only reports warnings
+logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+log = logging.getLogger("dochandler")
+_DEFAULT_LOG_LEVEL = 'WARNING' if os.environ.get('WEBSITE_SITE_NAME') else 'DEBUG'
+_log_level = os.environ.get('LOG_LEVEL', _DEFAULT_LOG_LEVEL).upper()
+# getLevelName returns the numeric level for known names, a "Level ..." string otherwise
+log.setLevel(_log_level if isinstance(logging.getLevelName(_log_level), int) else _DEFAULT_LOG_LEVEL)
 
 app = FastAPI(title="Document Handler API", version="1.0.0")
 
+# Upper bound on the base64 payload (and on the whole request body, allowing for the JSON envelope)
+MAX_B64 = 32 * 1024 * 1024
+MAX_REQUEST_BODY = MAX_B64 + 64 * 1024
+
+class RequestBodyLimitMiddleware:
+    """
+    Pure ASGI middleware rejecting requests whose Content-Length exceeds max_body before the body is read
+    (chunked bodies without a Content-Length are capped while reading, see read_request_body)
+    """
+    def __init__(self, app, max_body: int):
+        self.app = app
+        self.max_body = max_body
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            for name, value in scope["headers"]:
+                if name == b"content-length":
+                    if value.isdigit() and int(value) > self.max_body:
+                        response = JSONResponse(status_code=413, content={"detail": "Request body too large"})
+                        await response(scope, receive, send)
+                        return
+                    break
+        await self.app(scope, receive, send)
+
+# Added before CORS so CORS stays outermost and 413 responses still carry CORS headers
+app.add_middleware(RequestBodyLimitMiddleware, max_body=MAX_REQUEST_BODY)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -20,7 +64,22 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
-class DocumentRequest(BaseModel):
+# Request body decoded with msgspec instead of Pydantic (the body is mostly one large base64 string)
+# (strict: 1.0 or true are not accepted as IDs, see DocumentRequestModel)
+class DocumentRequest(msgspec.Struct):
+    record_id: Annotated[Union[str, int], msgspec.Meta(description="Record ID (can be string or number)")]
+    document_id: Annotated[Union[str, int], msgspec.Meta(description="Document ID (can be string or number)")]
+    base64_data: Annotated[str, msgspec.Meta(description="Base64 encoded document data")]
+
+DOCUMENT_REQUEST_DECODER = msgspec.json.Decoder(DocumentRequest)
+
+# Inline JSON schema so the OpenAPI docs still describe the request body
+_, _schema_components = msgspec.json.schema_components([DocumentRequest])
+DOCUMENT_REQUEST_SCHEMA = _schema_components["DocumentRequest"]
+
+# Pydantic model used when msgspec rejects a body: keeps FastAPI's lax coercion (e.g. 1.0 or true as IDs)
+# and its standard 422 error list for invalid requests
+class DocumentRequestModel(BaseModel):
     record_id: Union[str, int] = Field(..., description="Record ID (can be string or number)")
     document_id: Union[str, int] = Field(..., description="Document ID (can be string or number)")
     base64_data: str = Field(..., description="Base64 encoded document data")
@@ -32,46 +91,144 @@ class DocumentResponse(BaseModel):
     confidence_score: float
     reason: str
 
-def detect_file_type(base64_data: str) -> tuple[str, str]:
+# Accepted file types and their confidence scores
+ACCEPTED_TYPES: Final[Dict[str, tuple[float, str]]] = {
+    'application/pdf': (0.95, "PDF document - Accepted"),
+    'image/jpeg': (0.85, "JPEG image - Accepted"),
+    'image/png': (0.85, "PNG image - Accepted"),
+    'image/gif': (0.80, "GIF image - Accepted"),
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document': (0.90, "DOCX document - Accepted"),
+    'application/msword': (0.85, "DOC document - Accepted"),
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': (0.90, "XLSX spreadsheet - Accepted"),
+    'application/vnd.ms-excel': (0.85, "XLS spreadsheet - Accepted"),
+    'application/vnd.openxmlformats-officedocument.presentationml.presentation': (0.90, "PPTX presentation - Accepted"),
+    'application/vnd.ms-powerpoint': (0.85, "PPT presentation - Accepted"),
+    'text/plain': (0.70, "Text file - Accepted"),
+    'application/json': (0.75, "JSON file - Accepted"),
+    'application/xml': (0.75, "XML file - Accepted"),
+    'text/html': (0.70, "HTML file - Accepted"),
+    'text/csv': (0.75, "CSV file - Accepted")
+}
+
+# Temp directory in working directory (created once at import)
+_TEMP_DIR = os.path.join(os.getcwd(), "temp_files")
+os.makedirs(_TEMP_DIR, exist_ok=True)
+
+# Per-process sequence number for temp file names (random suffix keeps workers apart)
+_FILE_COUNTER = itertools.count()
+
+# Payloads at least this large are written through mmap instead of os.write
+MMAP_WRITE_THRESHOLD = 1 << 20
+
+# File signatures (magic bytes); all Office Open XML formats share the ZIP signature
+FILE_SIGNATURES: Final[Dict[bytes, tuple[str, str]]] = {
+    b'\x89PNG\r\n\x1a\n': ('image/png', 'png'),
+    b'\xff\xd8\xff': ('image/jpeg', 'jpg'),
+    b'GIF87a': ('image/gif', 'gif'),
+    b'GIF89a': ('image/gif', 'gif'),
+    b'%PDF': ('application/pdf', 'pdf'),
+    b'PK\x03\x04': ('application/zip', 'zip'),
+    b'PK\x05\x06': ('application/zip', 'zip'),
+    b'PK\x07\x08': ('application/zip', 'zip'),
+}
+
+# Signatures grouped by length (longest first) so each length is a single dict lookup
+SIG_BY_LEN: Final[Dict[int, Dict[bytes, tuple[str, str]]]] = {}
+for _signature, _file_type in sorted(FILE_SIGNATURES.items(), key=lambda item: -len(item[0])):
+    SIG_BY_LEN.setdefault(len(_signature), {})[_signature] = _file_type
+
+# Text types a data URL may declare for content that decodes as text
+TEXT_DATA_URL_TYPES: Final[Dict[str, str]] = {
+    'text/plain': 'txt',
+    'text/csv': 'csv',
+}
+
+# Bytes decoded when scanning ZIP local file headers for Office Open XML parts
+ZIP_SNIFF_BYTES = 64 * 1024
+
+# Part name prefixes that identify Office Open XML documents inside a ZIP archive
+OFFICE_ZIP_PARTS: Final[Dict[bytes, tuple[str, str]]] = {
+    b'word/': ('application/vnd.openxmlformats-officedocument.wordprocessingml.document', 'docx'),
+    b'xl/': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+    b'ppt/': ('application/vnd.openxmlformats-officedocument.presentationml.presentation', 'pptx'),
+}
+
+def _detect_office_zip(decoded_data: Union[bytes, bytearray]) -> Optional[tuple[str, str]]:
     """
-    Detect file type from base64 data
-    Returns: (mime_type, file_extension)
+    Walk the ZIP local file headers in the decoded data for Office Open XML parts
+    Returns: (mime_type, file_extension) or None unless both [Content_Types].xml and a
+    word/, xl/ or ppt/ part are found
     """
-    try:
-        # Decode base64 data
-        decoded_data = base64.b64decode(base64_data)
+    has_content_types = False
+    office_type = None
+    offset = 0
+    while offset + 30 <= len(decoded_data) and decoded_data[offset:offset + 4] == b'PK\x03\x04':
+        flags, = struct.unpack_from('<H', decoded_data, offset + 6)
+        compressed_size, = struct.unpack_from('<I', decoded_data, offset + 18)
+        name_length, extra_length = struct.unpack_from('<HH', decoded_data, offset + 26)
+        name = decoded_data[offset + 30:offset + 30 + name_length]
         
-        print(f"🔍 Analyzing file... File size: {len(decoded_data)} bytes")
+        if name == b'[Content_Types].xml':
+            has_content_types = True
+        elif office_type is None:
+            for part_prefix, file_type in OFFICE_ZIP_PARTS.items():
+                if name.startswith(part_prefix):
+                    office_type = file_type
+                    break
+        if has_content_types and office_type is not None:
+            return office_type
         
-        # Try to detect from base64 header if present
-        if base64_data.startswith('data:'):
-            try:
-                header, data = base64_data.split(',', 1)
-                mime_type = header.split(':')[1].split(';')[0]
-                file_extension = mime_type.split('/')[-1] if '/' in mime_type else 'bin'
-                print(f"📄 Detected from data URL: {mime_type} -> .{file_extension}")
-                return mime_type, file_extension
-            except:
-                pass
+        data_start = offset + 30 + name_length + extra_length
+        if flags & 0x08 or compressed_size == 0xFFFFFFFF:
+            # Sizes follow the data (data descriptor) or live in the ZIP64 extra field:
+            # the entry data cannot be skipped, so search for the next header signature
+            offset = decoded_data.find(b'PK\x03\x04', data_start)
+            if offset < 0:
+                break
+        else:
+            # Skip the entry data so headers of nested (stored) archives are never read
+            offset = data_start + compressed_size
+    return None
+
+def _is_text(decoded_data: Union[bytes, bytearray], n: int = 512) -> bool:
+    """
+    Check whether the first n bytes are UTF-8 text without control characters
+    Returns: True for text content
+    """
+    try:
+        # Incremental decoder tolerates a multi-byte character cut off at the end of the slice
+        text = codecs.getincrementaldecoder('utf-8')().decode(bytes(decoded_data[:n]), final=False)
+    except UnicodeDecodeError:
+        return False
+    return bool(text) and not any(ch < ' ' and ch not in '\t\n\r\f' for ch in text)
+
+def _split_data_url(data: str) -> tuple[Optional[str], str]:
+    """
+    Split an optional data URL prefix (data:<mime>;base64,) from base64 data
+    Returns: (mime_type or None, base64_body)
+    """
+    if not data.startswith('data:'):
+        return None, data
+    header, _, body = data.partition(',')
+    mime_type = header[5:].split(';', 1)[0]
+    return mime_type or None, body
+
+def detect_file_type(decoded_data: Union[bytes, bytearray], data_url_mime: Optional[str] = None) -> tuple[str, str]:
+    """
+    Detect file type from already decoded data; the optional data URL MIME type only refines plain text
+    Returns: (mime_type, file_extension)
+    """
+    try:
+        log.debug("🔍 Analyzing file... Header size: %d bytes", len(decoded_data))
         
         # Try to detect from file signature (magic bytes)
-        file_signatures = {
-            b'\x89PNG\r\n\x1a\n': ('image/png', 'png'),
-            b'\xff\xd8\xff': ('image/jpeg', 'jpg'),
-            b'GIF87a': ('image/gif', 'gif'),
-            b'GIF89a': ('image/gif', 'gif'),
-            b'%PDF': ('application/pdf', 'pdf'),
-            b'PK\x03\x04': ('application/zip', 'zip'),
-            b'PK\x05\x06': ('application/zip', 'zip'),
-            b'PK\x07\x08': ('application/zip', 'zip'),
-            b'\x50\x4b\x03\x04': ('application/vnd.openxmlformats-officedocument.wordprocessingml.document', 'docx'),
-            b'\x50\x4b\x05\x06': ('application/vnd.openxmlformats-officedocument.wordprocessingml.document', 'docx'),
-            b'\x50\x4b\x07\x08': ('application/vnd.openxmlformats-officedocument.wordprocessingml.document', 'docx'),
-        }
-        
-        for signature, (mime_type, ext) in file_signatures.items():
-            if decoded_data.startswith(signature):
-                print(f"📄 Detected from signature: {mime_type} -> .{ext}")
+        for length, signatures in SIG_BY_LEN.items():
+            match = signatures.get(bytes(decoded_data[:length]))
+            if match is not None:
+                mime_type, ext = match
+                if decoded_data.startswith(b'PK\x03\x04'):
+                    mime_type, ext = _detect_office_zip(decoded_data) or match
+                log.debug("📄 Detected from signature: %s -> .%s", mime_type, ext)
                 return mime_type, ext
         
         # Fallback: try to detect from first few bytes
@@ -80,128 +237,217 @@ def detect_file_type(base64_data: str) -> tuple[str, str]:
             try:
                 text_start = decoded_data[:100].decode('utf-8', errors='ignore')
                 if text_start.startswith('<?xml'):
-                    print("📄 Detected: XML file -> .xml")
+                    log.debug("📄 Detected: XML file -> .xml")
                     return 'application/xml', 'xml'
                 elif text_start.startswith('{') or text_start.startswith('['):
-                    print("📄 Detected: JSON file -> .json")
+                    log.debug("📄 Detected: JSON file -> .json")
                     return 'application/json', 'json'
                 elif text_start.startswith('<html') or text_start.startswith('<!DOCTYPE'):
-                    print("📄 Detected: HTML file -> .html")
+                    log.debug("📄 Detected: HTML file -> .html")
                     return 'text/html', 'html'
                 elif text_start.startswith('<?php'):
-                    print("📄 Detected: PHP file -> .php")
+                    log.debug("📄 Detected: PHP file -> .php")
                     return 'application/x-httpd-php', 'php'
                 elif text_start.startswith('#!/'):
-                    print("📄 Detected: Script file -> .txt")
+                    log.debug("📄 Detected: Script file -> .txt")
                     return 'text/plain', 'txt'
             except:
                 pass
         
+        # The client-declared data URL MIME type may only refine content that is verifiably text
+        # (e.g. CSV vs plain text); it never turns unrecognised binary data into an accepted type
+        if data_url_mime in TEXT_DATA_URL_TYPES and _is_text(decoded_data):
+            file_extension = TEXT_DATA_URL_TYPES[data_url_mime]
+            log.debug("📄 Detected text declared by data URL: %s -> .%s", data_url_mime, file_extension)
+            return data_url_mime, file_extension
+        
         # Ultimate fallback
-        print("📄 Could not detect file type, using generic binary -> .bin")
+        log.debug("📄 Could not detect file type, using generic binary -> .bin")
         return 'application/octet-stream', 'bin'
         
     except Exception as e:
-        print(f"❌ Error detecting file type: {e}")
+        log.warning("❌ Error detecting file type: %s", e)
         # Ultimate fallback
         return 'application/octet-stream', 'bin'
 
-def save_temp_file(decoded_data: bytes, record_id: Union[str, int], 
+def b64_decoded_len(b64: str) -> int:
+    """
+    Compute the decoded size of base64 data from its length and padding, without decoding
+    Returns: decoded size in bytes
+    """
+    return 3 * (len(b64) // 4) - b64[-2:].count('=')
+
+def _decode_prefix(b64: str, n: int = 512) -> bytes:
+    """
+    Decode and validate only enough of the base64 data to cover the first n bytes of the file
+    Returns: decoded header bytes
+    """
+    try:
+        # The slice length is a multiple of 4, so any prefix of valid base64 validates on its own;
+        # malformed input (bad padding, line breaks, stray characters) gets a 400 even when it would be rejected
+        return pybase64.b64decode(b64[:((n + 2) // 3) * 4 + 4], validate=True)
+    except (binascii.Error, ValueError) as e:
+        log.debug("❌ Invalid base64 data: %s", e)
+        raise HTTPException(status_code=400, detail=f"Invalid base64 data: {str(e)}")
+
+def decode_base64_data(base64_data: str) -> bytearray:
+    """
+    Fully decode and validate base64 data straight into a bytearray
+    Returns: decoded file bytes
+    """
+    try:
+        # pybase64 validates during the SIMD decode itself; validate=False would add a filtering pass
+        decoded_data = pybase64.b64decode_as_bytearray(base64_data, validate=True)
+    except (binascii.Error, ValueError) as e:
+        log.debug("❌ Invalid base64 data: %s", e)
+        raise HTTPException(status_code=400, detail=f"Invalid base64 data: {str(e)}")
+    
+    if len(decoded_data) == 0:
+        log.debug("❌ Empty file data")
+        raise HTTPException(status_code=400, detail="Empty file data")
+    
+    log.debug("✅ Base64 validation successful")
+    return decoded_data
+
+def save_temp_file(decoded_data: Union[bytes, bytearray], record_id: Union[str, int], 
                   document_id: Union[str, int], file_extension: str) -> str:
     """
     Save decoded data to a temporary file in the working directory
     Returns: temporary file path
     """
     # Create a unique filename
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    unique_id = str(uuid.uuid4())[:8]
-    filename = f"record_{record_id}_doc_{document_id}_{timestamp}_{unique_id}.{file_extension}"
+    filename = f"record_{record_id}_doc_{document_id}_{next(_FILE_COUNTER)}_{os.urandom(4).hex()}.{file_extension}"
     
-    # Create temp directory in working directory
-    temp_dir = os.path.join(os.getcwd(), "temp_files")
-    os.makedirs(temp_dir, exist_ok=True)
+    temp_file_path = os.path.join(_TEMP_DIR, filename)
     
-    temp_file_path = os.path.join(temp_dir, filename)
-    
-    # Write data to temporary file
-    with open(temp_file_path, 'wb') as temp_file:
-        temp_file.write(decoded_data)
+    # Write data to temporary file with raw unbuffered writes
+    fd = os.open(temp_file_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o600)
+    try:
+        if hasattr(os, 'posix_fallocate') and len(decoded_data) > 0:
+            try:
+                os.posix_fallocate(fd, 0, len(decoded_data))
+            except OSError:
+                pass  # Filesystem does not support preallocation
+        
+        if len(decoded_data) >= MMAP_WRITE_THRESHOLD:
+            # Large payloads: map the file and copy the data in with a single memcpy
+            os.ftruncate(fd, len(decoded_data))
+            with mmap.mmap(fd, len(decoded_data), access=mmap.ACCESS_WRITE) as mapped:
+                mapped[:] = decoded_data
+        else:
+            view = memoryview(decoded_data)
+            while view:
+                written = os.write(fd, view)
+                view = view[written:]
+    finally:
+        os.close(fd)
     
-    print(f"💾 File saved to: {temp_file_path}")
-    print(f"📁 File size: {len(decoded_data)} bytes")
+    log.debug("💾 File saved to: %s (%d bytes)", temp_file_path, len(decoded_data))
     
     return temp_file_path
 
+async def read_request_body(http_request: Request) -> bytearray:
+    """
+    Read the request body, stopping as soon as it grows past MAX_REQUEST_BODY
+    Returns: raw body bytes
+    """
+    body = bytearray()
+    async for chunk in http_request.stream():
+        body += chunk
+        if len(body) > MAX_REQUEST_BODY:
+            log.debug("❌ Request body too large: more than %d bytes", MAX_REQUEST_BODY)
+            raise HTTPException(status_code=413, detail="Request body too large")
+    return body
+
+# The root response only changes with the API version, so clients may cache it
+ROOT_ETAG = f'"root-{app.version}"'
+ROOT_HEADERS = {"Cache-Control": "public, max-age=3600", "ETag": ROOT_ETAG}
+
 @app.get("/")
-async def root():
-    return {"message": "Document Handler API", "version": "1.0.0"}
+async def root(request: Request):
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None and (
+        if_none_match.strip() == "*"
+        or ROOT_ETAG in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    ):
+        return Response(status_code=304, headers=ROOT_HEADERS)
+    return JSONResponse({"message": "Document Handler API", "version": app.version}, headers=ROOT_HEADERS)
 
-@app.post("/process-document", response_model=DocumentResponse)
-async def process_document(request: DocumentRequest):
+@app.post(
+    "/process-document",
+    # FastAPI serializes straight to JSON bytes through the response model (its fast path)
+    response_model=DocumentResponse,
+    responses={
+        # HTTPValidationError is FastAPI's own schema component for its standard 422 body
+        422: {"description": "Validation Error",
+              "content": {"application/json": {"schema": {"$ref": "#/components/schemas/HTTPValidationError"}}}},
+    },
+    openapi_extra={"requestBody": {"required": True, "content": {"application/json": {"schema": DOCUMENT_REQUEST_SCHEMA}}}},
+)
+async def process_document(http_request: Request):
     """
     Process document: detect type and save as temporary backup
     """
+    body = await read_request_body(http_request)
+    try:
+        request = DOCUMENT_REQUEST_DECODER.decode(body)
+    except msgspec.DecodeError:
+        # Slow path: let Pydantic coerce the body like FastAPI would, or report its standard errors
+        try:
+            request = DocumentRequestModel.model_validate_json(body)
+        except ValidationError as e:
+            log.debug("❌ Invalid request body: %s", e)
+            errors = []
+            for error in e.errors(include_url=False):
+                error = {**error, "loc": ("body", *error["loc"])}
+                if error["type"] == "json_invalid":
+                    error["input"] = {}  # As FastAPI reports it; never echo the raw body back
+                errors.append(error)
+            raise RequestValidationError(errors)
+    
     try:
-        print(f"\n🚀 Processing document request:")
-        print(f"   Record ID: {request.record_id}")
-        print(f"   Document ID: {request.document_id}")
+        log.debug("🚀 Processing document request: record_id=%s document_id=%s",
+                  request.record_id, request.document_id)
         
         # Clean base64 data (remove data URL prefix if present)
-        base64_data = request.base64_data
-        if base64_data.startswith('data:'):
-            base64_data = base64_data.split(',', 1)[1]
+        data_url_mime, base64_data = _split_data_url(request.base64_data)
         
-        # Validate base64 data
-        try:
-            decoded_data = base64.b64decode(base64_data, validate=True)
-        except Exception as e:
-            print(f"❌ Invalid base64 data: {str(e)}")
-            raise HTTPException(status_code=400, detail=f"Invalid base64 data: {str(e)}")
+        if len(base64_data) > MAX_B64:
+            log.debug("❌ Payload too large: %d bytes", b64_decoded_len(base64_data))
+            raise HTTPException(status_code=413, detail=f"Base64 data exceeds {MAX_B64} characters")
         
-        if len(decoded_data) == 0:
-            print("❌ Empty file data")
+        if not base64_data:
+            log.debug("❌ Empty file data")
             raise HTTPException(status_code=400, detail="Empty file data")
         
-        print(f"✅ Base64 validation successful")
-        
-        # Detect file type
-        mime_type, file_extension = detect_file_type(base64_data)
+        # Detect file type from the decoded header only
+        mime_type, file_extension = detect_file_type(_decode_prefix(base64_data), data_url_mime)
         
-        # Calculate confidence score and determine status
-        confidence_score = 0.0
-        status = "rejected"
-        reason = ""
-        
-        # Define accepted file types and their confidence scores
-        accepted_types = {
-            'application/pdf': (0.95, "PDF document - Accepted"),
-            'image/jpeg': (0.85, "JPEG image - Accepted"),
-            'image/png': (0.85, "PNG image - Accepted"),
-            'image/gif': (0.80, "GIF image - Accepted"),
-            'application/vnd.openxmlformats-officedocument.wordprocessingml.document': (0.90, "DOCX document - Accepted"),
-            'application/msword': (0.85, "DOC document - Accepted"),
-            'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': (0.90, "XLSX spreadsheet - Accepted"),
-            'application/vnd.ms-excel': (0.85, "XLS spreadsheet - Accepted"),
-            'application/vnd.openxmlformats-officedocument.presentationml.presentation': (0.90, "PPTX presentation - Accepted"),
-            'application/vnd.ms-powerpoint': (0.85, "PPT presentation - Accepted"),
-            'text/plain': (0.70, "Text file - Accepted"),
-            'application/json': (0.75, "JSON file - Accepted"),
-            'application/xml': (0.75, "XML file - Accepted"),
-            'text/html': (0.70, "HTML file - Accepted"),
-            'text/csv': (0.75, "CSV file - Accepted")
-        }
+        if mime_type == 'application/zip':
+            # Office Open XML parts may sit beyond the first header bytes; look at a larger prefix
+            mime_type, file_extension = detect_file_type(_decode_prefix(base64_data, ZIP_SNIFF_BYTES), data_url_mime)
         
-        if mime_type in accepted_types:
-            confidence_score, reason = accepted_types[mime_type]
-            status = "accepted"
-            print(f"✅ Document accepted: {reason}")
-        else:
-            confidence_score = 0.3
+        # Reject unsupported types straight away, without a full decode or a temp file
+        accepted = ACCEPTED_TYPES.get(mime_type)
+        if accepted is None:
             reason = f"File type '{mime_type}' not in accepted list - Rejected"
-            print(f"❌ Document rejected: {reason}")
+            log.debug("❌ Document rejected: %s (%d bytes)", reason, b64_decoded_len(base64_data))
+            return {
+                "record_id": request.record_id,
+                "document_id": request.document_id,
+                "status": "rejected",
+                "confidence_score": 0.3,
+                "reason": reason
+            }
+        
+        confidence_score, reason = accepted
+        log.debug("✅ Document accepted: %s (%d bytes)", reason, b64_decoded_len(base64_data))
         
-        # Save temporary file (for backend processing only)
-        temp_file_path = save_temp_file(
+        # Only accepted documents are fully decoded and saved (for backend processing only)
+        decoded_data = decode_base64_data(base64_data)
+        # Write off the event loop so other requests are served during disk I/O
+        temp_file_path = await run_in_threadpool(
+            save_temp_file,
             decoded_data, 
             request.record_id, 
             request.document_id, 
@@ -209,50 +455,59 @@ async def process_document(request: DocumentRequest):
         )
         
         # Prepare response with only 5 required fields
-        response = DocumentResponse(
-            record_id=request.record_id,
-            document_id=request.document_id,
-            status=status,
-            confidence_score=confidence_score,
-            reason=reason
-        )
+        response = {
+            "record_id": request.record_id,
+            "document_id": request.document_id,
+            "status": "accepted",
+            "confidence_score": confidence_score,
+            "reason": reason
+        }
         
-        print(f"📤 Sending response:")
-        print(f"   Status: {status}")
-        print(f"   Confidence Score: {confidence_score}")
-        print(f"   Reason: {reason}")
-        print(f"   File Type: {mime_type}")
-        print(f"   File Extension: {file_extension}")
-        print(f"   File Size: {len(decoded_data)} bytes")
-        print(f"   Saved to: {temp_file_path}")
+        log.debug("📤 Sending response: status=accepted confidence_score=%s reason=%s file_type=%s "
+                  "file_extension=%s saved_to=%s",
+                  confidence_score, reason, mime_type, file_extension, temp_file_path)
         
         return response
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Internal server error: {str(e)}")
+        log.exception("❌ Internal server error: %s", e)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    # Never serve a cached health status
+    return JSONResponse(
+        {"status": "healthy", "timestamp": datetime.now().isoformat()},
+        headers={"Cache-Control": "no-store"}
+    )
 
 @app.delete("/cleanup/{file_path}")
 async def cleanup_temp_file(file_path: str):
     """
     Optional endpoint to cleanup temporary files
     """
+    # Resolve relative names against the temp directory and refuse anything outside it
+    real_path = os.path.realpath(os.path.join(_TEMP_DIR, file_path))
+    base_dir = os.path.realpath(_TEMP_DIR)
     try:
-        if os.path.exists(file_path) and os.path.dirname(file_path) == os.path.join(os.getcwd(), "temp_files"):
-            os.remove(file_path)
-            print(f"🧹 Deleted file: {file_path}")
-            return {"message": "File deleted successfully", "file_path": file_path}
-        else:
-            raise HTTPException(status_code=404, detail="File not found or invalid path")
+        inside_temp_dir = real_path != base_dir and os.path.commonpath([real_path, base_dir]) == base_dir
+    except ValueError:
+        inside_temp_dir = False  # Different drives on Windows
+    if not inside_temp_dir:
+        raise HTTPException(status_code=400, detail="Invalid path")
+    
+    try:
+        await run_in_threadpool(os.unlink, real_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting file: {str(e)}")
+    
+    log.debug("🧹 Deleted file: %s", real_path)
+    return {"message": "File deleted successfully", "file_path": file_path}
 
 if __name__ == "__main__":
     import os
@@ -265,7 +520,6 @@ if __name__ == "__main__":
         # Production: Use Gunicorn
         try:
             import gunicorn.app.base
-            from gunicorn.six import iteritems
             
             class StandaloneApplication(gunicorn.app.base.BaseApplication):
                 def __init__(self, app, options=None):
@@ -274,9 +528,9 @@ if __name__ == "__main__":
                     super().__init__()
                 
                 def load_config(self):
-                    config = {key: value for key, value in iteritems(self.options)
+                    config = {key: value for key, value in self.options.items()
                              if key in self.cfg.settings and value is not None}
-                    for key, value in iteritems(config):
+                    for key, value in config.items():
                         self.cfg.set(key.lower(), value)
                 
                 def load(self):
@@ -291,6 +545,8 @@ if __name__ == "__main__":
                 'keepalive': 2,
                 'max_requests': 1000,
                 'max_requests_jitter': 50,
+                'preload_app': True,  # Share imported modules between workers via copy-on-write
+                'worker_tmp_dir': '/dev/shm',  # Keep worker heartbeat files off disk
                 'access_log_format': '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s" %(D)s'
             }
             